@@ -5,8 +5,10 @@ A runnable "MRG-style" myelinated axon model for NEURON (Python).
 - Builds repeating node/paranode/juxtaparanode/internode structure.
 - Uses Hodgkin-Huxley style mechanisms at nodes (as an approximation to full MRG),
   with adjusted conductances to better mimic high nodal excitability.
-- Provides functions to attach a time-varying current waveform (Vector.play -> IClamp.i)
-  and perform a binary-search threshold estimation (scale factor on waveform peak).
+- Provides functions to attach a time-varying current waveform (Vector.play -> IClamp.amp)
+  and perform a bracketed threshold search (scale factor on waveform peak).
+- An optional NEURON-free surrogate of the same fiber (Numba tridiagonal kernel)
+  gives warm-start brackets for that search.
 
 Notes:
 - This is an MRG-inspired implementation for simulation and comparison.
@@ -14,13 +16,56 @@ Notes:
   replace channel kinetics & densities with the original parameter set (ModelDB).
 """
 
+import functools
+import gc
+import os
+
 import numpy as np
 from neuron import h, gui
 import matplotlib.pyplot as plt
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # surrogate bracketing is skipped without numba; keep the kernel importable
+    HAVE_NUMBA = False
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
 h.load_file("stdrun.hoc")
 h.celsius = 37.0
+h.usetable_hh = 1  # hh rates via its built-in TABLE (FROM -100 TO 100 WITH 200), not exp() per step
 DT = 0.025  # ms simulation time step
+AP_THRESHOLD_MV = 0.0  # peak Vm above this at the recording node counts as a propagated AP
+
+# CoreNEURON (SoA-vectorized hh/pas kernels) is opt-in: set MRG_USE_CORENEURON=1
+# (needs a NEURON build with CoreNEURON); otherwise run_sim uses the stock h.run() loop.
+# SIMD width of the hh kernels is fixed when the mechanism library is built,
+# not here: e.g. build mechanisms with `nrnivmodl -coreneuron` against an NMODL
+# configured for the ISPC backend to get AVX2/AVX-512 nrn_cur/nrn_state.
+def _coreneuron_built():
+    """True if this NEURON build includes CoreNEURON."""
+    try:
+        from neuron import config
+    except ImportError:
+        # NEURON 8.x has no neuron.config; its non-default cmake options are in nrnversion(6)
+        return "NRN_ENABLE_CORENEURON=ON" in h.nrnversion(6)
+    flag = config.arguments.get("NRN_ENABLE_CORENEURON", "OFF")
+    return str(flag).upper() in ("ON", "TRUE", "1")
+
+USE_CORENEURON = os.environ.get("MRG_USE_CORENEURON", "0").lower() in ("1", "true", "on")
+if USE_CORENEURON:
+    try:
+        from neuron import coreneuron
+        _have_coreneuron = _coreneuron_built()
+    except ImportError:
+        _have_coreneuron = False
+    if not _have_coreneuron:
+        print("Warning: MRG_USE_CORENEURON is set but this NEURON build has no CoreNEURON; "
+              "using h.run().")
+        USE_CORENEURON = False
+_pc = None  # ParallelContext for CoreNEURON runs, set up by run_sim on first use
 
 # -------------------------
 # Biophysical helper params
@@ -57,163 +102,336 @@ def juxta_length_um(diam_um):
 # -------------------------
 # Build MRG-like fiber
 # -------------------------
-def make_MRG_fiber(diam_um=5.0, n_nodes=21):
+# The whole fiber is built inside one HOC template so that inserts, parameter
+# assignments and connects run in the HOC interpreter instead of crossing the
+# Python<->HOC boundary once per section attribute.
+MRG_FIBER_HOC = """
+begintemplate MRGFiber
+public node, paranode, juxta, intern, myelin, biophys
+create node[1], paranode[1], juxta[1], intern[1], myelin[1]
+
+// $1 n_nodes, $2 diam, $3 L_node, $4 L_para, $5 L_juxta, $6 L_intern (um)
+// $7 detailed: 1 = paranode/juxta/intern per segment, 0 = one 3-compartment myelin section
+proc init() { local i
+    nnodes = $1
+    detailed = $7
+    create node[nnodes]
+    // section arrays cannot be empty (and keep the size of the previous
+    // instance): shrink unused ones to a single placeholder and delete it
+    if (nnodes > 1 && detailed) {
+        create paranode[nnodes-1], juxta[nnodes-1], intern[nnodes-1]
+    } else {
+        create paranode[1], juxta[1], intern[1]
+        paranode[0] delete_section()
+        juxta[0] delete_section()
+        intern[0] delete_section()
+    }
+    if (nnodes > 1 && !detailed) {
+        create myelin[nnodes-1]
+    } else {
+        create myelin[1]
+        myelin[0] delete_section()
+    }
+    for i = 0, nnodes-1 node[i] { L = $3  diam = $2  nseg = 1 }
+    for i = 0, nnodes-2 {
+        if (detailed) {
+            paranode[i] { L = $4  diam = $2  nseg = 1 }
+            juxta[i]    { L = $5  diam = $2  nseg = 1 }
+            intern[i]   { L = $6  diam = $2  nseg = 1 }
+            // node_i(1) - paranode_i - juxta_i - intern_i - node_{i+1}(0)
+            connect paranode[i](0), node[i](1)
+            connect juxta[i](0), paranode[i](1)
+            connect intern[i](0), juxta[i](1)
+            connect node[i+1](0), intern[i](1)
+        } else {
+            myelin[i] { L = $4 + $5 + $6  diam = $2  nseg = 3 }
+            // node_i(1) - myelin_i - node_{i+1}(0)
+            connect myelin[i](0), node[i](1)
+            connect node[i+1](0), myelin[i](1)
+        }
+    }
+}
+
+// $1 Ra, $2 cm_node, $3 cm_internode, $4 gnabar, $5 gkbar, $6 gl, $7 e_leak, $8 g_pas
+proc biophys() { local i
+    for i = 0, nnodes-1 node[i] {
+        Ra = $1  cm = $2
+        insert hh  // use hh as node mechanism (approximate)
+        gnabar_hh = $4  gkbar_hh = $5  gl_hh = $6  el_hh = $7
+    }
+    for i = 0, nnodes-2 {
+        if (detailed) {
+            paranode[i] { Ra = $1  cm = $3  insert pas  g_pas = $8  e_pas = $7 }
+            juxta[i]    { Ra = $1  cm = $3  insert pas  g_pas = $8  e_pas = $7 }
+            intern[i]   { Ra = $1  cm = $3  insert pas  g_pas = $8  e_pas = $7 }
+        } else {
+            myelin[i]   { Ra = $1  cm = $3  insert pas  g_pas = $8  e_pas = $7 }
+        }
+    }
+}
+endtemplate MRGFiber
+"""
+
+def make_MRG_fiber(diam_um=5.0, n_nodes=21, detailed_paranodes=False, cached=False):
     """
     Build a myelinated fiber with repeating sections:
     node_i - paranode_i - juxta_i - internode_i - ... - node_{i+1}
-    Returns dict with lists: nodes, paranos, juxtas, interns
+    Returns dict with lists: nodes, paranos, juxtas, interns, myelins
+    (plus 'cell', the HOC MRGFiber object that owns the sections)
     Stimulate at central node index mid_idx = len(nodes)//2
+
+    The paranode, juxta and internode share Ra, cm, pas and diam, so by default
+    each myelinated segment is one 'myelin' section of their summed length
+    (nseg=3) and paranos/juxtas/interns are empty. Pass detailed_paranodes=True
+    (e.g. for publication runs) to build the three sections separately.
+
+    With cached=True, fibers are cached in-process by (diam_um, n_nodes,
+    detailed_paranodes): a repeated call returns the same sections (states are
+    reset by h.finitialize in run_sim). Every cached fiber stays in the NEURON
+    model and is simulated on each run, so only opt in when the same fiber is
+    searched repeatedly, and call fiber_teardown() when done with it.
     """
-    nodes = []
-    paranos = []
-    juxtas = []
-    interns = []
+    key = (float(diam_um), int(n_nodes), bool(detailed_paranodes))
+    if cached:
+        return _cached_MRG_fiber(*key)
+    return _build_MRG_fiber(*key)
+
+def _build_MRG_fiber(diam_um, n_nodes, detailed_paranodes, cached=False):
+    if not hasattr(h, 'MRGFiber'):
+        h(MRG_FIBER_HOC)
 
     # convert geometry; NEURON uses µm for L and diam
-    for i in range(n_nodes):
-        # Node
-        nd = h.Section(name=f'node_{i}')
-        nd.L = node_length_um()
-        nd.diam = diam_um
-        nd.Ra = DEFAULT_RA
-        nd.nseg = 1
-        nd.cm = CM_NODE
-        nd.insert('hh')  # use hh as node mechanism (approximate)
-        # scale hh conductances to approximate nodal densities
-        try:
-            nd.gnabar_hh = G_NA_BAR
-            nd.gkbar_hh = G_K_BAR
-            nd.gl_hh = G_LEAK_NODE
-            nd.el_hh = E_LEAK
-        except Exception:
-            # some NEURON hh variants don't expose same names; fallback: set via mechanism
-            pass
-        nodes.append(nd)
-
-        if i < n_nodes - 1:
-            # Paranode
-            pn = h.Section(name=f'paranode_{i}')
-            pn.L = paranode_length_um(diam_um)
-            pn.diam = diam_um
-            pn.Ra = DEFAULT_RA
-            pn.nseg = 1
-            pn.cm = CM_INTERNODE  # reduced cm
-            pn.insert('pas')
-            pn.g_pas = G_PAS_INTERN
-            pn.e_pas = E_LEAK
-            paranos.append(pn)
-
-            # Juxtaparanode
-            jx = h.Section(name=f'juxta_{i}')
-            jx.L = juxta_length_um(diam_um)
-            jx.diam = diam_um
-            jx.Ra = DEFAULT_RA
-            jx.nseg = 1
-            jx.cm = CM_INTERNODE
-            jx.insert('pas')
-            jx.g_pas = G_PAS_INTERN
-            jx.e_pas = E_LEAK
-            juxtas.append(jx)
-
-            # Internode (myelinated)
-            intern = h.Section(name=f'intern_{i}')
-            intern.L = internode_length_from_diam(diam_um)
-            intern.diam = diam_um
-            intern.Ra = DEFAULT_RA
-            intern.nseg = 1
-            intern.cm = CM_INTERNODE
-            intern.insert('pas')
-            intern.g_pas = G_PAS_INTERN
-            intern.e_pas = E_LEAK
-            interns.append(intern)
-
-    # connect sections in sequence:
-    # node0(1) -- paranode0(0)
-    # paranode0(1) -- juxta0(0)
-    # juxta0(1) -- intern0(0)
-    # intern0(1) -- node1(0)
-    for i in range(len(nodes)-1):
-        paranos[i].connect(nodes[i](1.0))
-        juxtas[i].connect(paranos[i](1.0))
-        interns[i].connect(juxtas[i](1.0))
-        nodes[i+1].connect(interns[i](1.0))
+    # lengths depend only on diam_um: compute once, not per section
+    L_node = node_length_um()
+    L_para = paranode_length_um(diam_um)
+    L_juxta = juxta_length_um(diam_um)
+    L_intern = internode_length_from_diam(diam_um)
+
+    cell = h.MRGFiber(n_nodes, diam_um, L_node, L_para, L_juxta, L_intern,
+                      1 if detailed_paranodes else 0)
+    # scale hh conductances to approximate nodal densities; reduced cm on myelinated parts
+    cell.biophys(DEFAULT_RA, CM_NODE, CM_INTERNODE,
+                 G_NA_BAR, G_K_BAR, G_LEAK_NODE, E_LEAK, G_PAS_INTERN)
+
+    n_seg = n_nodes - 1
+    nodes = [cell.node[i] for i in range(n_nodes)]
+    if detailed_paranodes:
+        paranos = [cell.paranode[i] for i in range(n_seg)]
+        juxtas = [cell.juxta[i] for i in range(n_seg)]
+        interns = [cell.intern[i] for i in range(n_seg)]
+        myelins = []
+    else:
+        paranos, juxtas, interns = [], [], []
+        myelins = [cell.myelin[i] for i in range(n_seg)]
 
     fiber = {
+        'cell': cell,
         'nodes': nodes,
         'paranos': paranos,
         'juxtas': juxtas,
         'interns': interns,
-        'mid_idx': len(nodes)//2
+        'myelins': myelins,
+        'mid_idx': len(nodes)//2,
+        'cached': cached
     }
     return fiber
 
+@functools.lru_cache(maxsize=16)
+def _cached_MRG_fiber(diam_um, n_nodes, detailed_paranodes):
+    return _build_MRG_fiber(diam_um, n_nodes, detailed_paranodes, cached=True)
+
+def fiber_teardown(fiber):
+    """
+    Delete the fiber's sections from NEURON now. For a cached fiber, the
+    build cache is invalidated too.
+    """
+    for key in ('nodes', 'paranos', 'juxtas', 'interns', 'myelins'):
+        for sec in fiber[key]:
+            h.delete_section(sec=sec)
+    if fiber['cached']:
+        # the cache may hand out the deleted sections again
+        _cached_MRG_fiber.cache_clear()
+
 # -------------------------
 # Stimulation utilities
 # -------------------------
-def attach_vector_stim(node_section, tvec_ms, ivec_nA):
+def build_vector_stim(node_section, tvec_ms):
     """
-    Attach a time-varying current waveform to node_section(0.5) by playing Vector -> IClamp.i
+    Create an IClamp at node_section(0.5) driven by Vector.play, with a zeroed current vector.
     tvec_ms: 1D array-like of times in ms
-    ivec_nA: 1D array-like of currents in nA (NEURON's point current units)
+    Fill the current (nA) with update_stim() between runs; the play connection is reused.
     Returns (stim, vt, vi) to keep references alive.
     """
     stim = h.IClamp(node_section(0.5))
     stim.delay = 0
     stim.dur = 1e9  # long because we'll override with Vector.play
-    vt = h.Vector(list(tvec_ms))
-    vi = h.Vector(list(ivec_nA))
-    vi.play(stim._ref_i, vt, 1)  # play current (nA) into IClamp.i
+    tvec_ms = np.ascontiguousarray(tvec_ms, dtype=np.float64)
+    vt = h.Vector(tvec_ms.size)
+    vt.as_numpy()[:] = tvec_ms
+    vi = h.Vector(tvec_ms.size)  # zero-filled
+    vi.play(stim._ref_amp, vt, 1)  # play current (nA) into IClamp.amp (IClamp overwrites i each step)
     return stim, vt, vi
 
-def record_section_v(section):
-    vt = h.Vector()
+def update_stim(vi, ivec_nA):
+    """
+    Overwrite the contents of a played current vector in place (same length as tvec).
+    """
+    vi.as_numpy()[:] = ivec_nA  # copy through the buffer, no Python list round-trip
+
+def attach_vector_stim(node_section, tvec_ms, ivec_nA):
+    """
+    Attach a time-varying current waveform to node_section(0.5) by playing Vector -> IClamp.amp
+    tvec_ms: 1D array-like of times in ms
+    ivec_nA: 1D array-like of currents in nA (NEURON's point current units)
+    Returns (stim, vt, vi) to keep references alive.
+    """
+    stim, vt, vi = build_vector_stim(node_section, tvec_ms)
+    update_stim(vi, ivec_nA)
+    return stim, vt, vi
+
+def record_v(section, tstop_ms=None):
+    """
+    Record v at section(0.5). With tstop_ms, reserve room for the whole run up
+    front so the Vector does not regrow during recording; rewinding it with
+    resize(0) keeps that capacity for the next run.
+    """
     vv = h.Vector()
-    vt.record(h._ref_t)
+    if tstop_ms is not None:
+        vv.buffer_size(int(tstop_ms/DT) + 8)
     vv.record(section(0.5)._ref_v)
-    return vt, vv
+    return vv
+
+def record_section_v(section, tstop_ms=None):
+    """
+    Record t and v at section(0.5); see record_v for tstop_ms.
+    """
+    vt = h.Vector()
+    if tstop_ms is not None:
+        vt.buffer_size(int(tstop_ms/DT) + 8)
+    vt.record(h._ref_t)
+    return vt, record_v(section, tstop_ms)
 
 def run_sim(tstop_ms):
+    global _pc
     h.tstop = tstop_ms
     h.dt = DT
-    h.finitialize(E_LEAK)
-    h.run()
+    if USE_CORENEURON:
+        if _pc is None:
+            h.CVode().cache_efficient(1)  # CoreNEURON needs the cache-efficient data layout
+            coreneuron.enable = True
+            coreneuron.verbose = 0
+            _pc = h.ParallelContext()
+        # same as h.run() (stdinit + continuerun), with the time loop handed to CoreNEURON
+        h.stdinit()
+        _pc.psolve(tstop_ms)
+    else:
+        h.finitialize(E_LEAK)
+        h.run()
 
 # -------------------------
 # Threshold search
 # -------------------------
 def find_threshold(fiber, tvec_ms, base_waveform_nA, scale_lo=0.0, scale_hi=1000.0,
-                   tol=1e-2, max_iters=20, record_node_index=None):
+                   tol=1e-2, max_iters=20, record_node_index=None, max_widen=0):
     """
     Binary-search threshold scale factor 's' such that s * base_waveform evokes a propagated AP.
     - fiber: dict from make_MRG_fiber
     - tvec_ms, base_waveform_nA: arrays (same length)
-    - returns threshold scale factor (multiplicative on waveform)
+    - max_widen: for a guessed (narrow) bracket, how many times scale_hi may be
+      doubled (or a positive scale_lo halved) when the bracket misses threshold
+    - returns threshold scale factor (multiplicative on waveform), or None if
+      the (widened) bracket still does not contain the threshold
     """
     nodes = fiber['nodes']
     mid = fiber['mid_idx']
     rec_idx = record_node_index if record_node_index is not None else (len(nodes)-1)  # record at distal node
-    rec_t, rec_v = record_section_v(nodes[rec_idx])
+    tstop = tvec_ms[-1] + 5.0
+    # AP detection only needs a threshold-crossing count, no trace is recorded
+    if USE_CORENEURON:
+        # CoreNEURON has no APCount; record spikes from a gid-registered detector
+        pc = h.ParallelContext()
+        pc.set_gid2node(0, pc.id())
+        apc = h.NetCon(nodes[rec_idx](0.5)._ref_v, None, sec=nodes[rec_idx])
+        apc.threshold = AP_THRESHOLD_MV
+        pc.cell(0, apc)
+        spikes, spike_ids = h.Vector(), h.Vector()
+        pc.spike_record(0, spikes, spike_ids)
+    else:
+        apc = h.APCount(nodes[rec_idx](0.5))
+        apc.thresh = AP_THRESHOLD_MV
+        spikes = None
+
+    base = np.ascontiguousarray(base_waveform_nA, dtype=np.float64)
+    # one IClamp + play vectors for the whole search; only the current values change
+    stim, vt, vi = build_vector_stim(nodes[mid], tvec_ms)
+
+    # bind everything test_scale touches once, so the hot loop does no
+    # global/attribute lookups; vi is never resized, so its numpy view stays
+    # valid and s*base is written straight into the played current vector
+    _multiply = np.multiply
+    _stim_buf = vi.as_numpy()
+    _run = run_sim
 
     def test_scale(s):
-        # Remove previous stimuli by creating a new stim each test (Vectors are local)
-        stim, vt, vi = attach_vector_stim(nodes[mid], tvec_ms, (base_waveform_nA * s).tolist())
-        run_sim(tvec_ms[-1] + 5.0)
-        Vm = np.array(rec_v)
-        # detect AP: simple threshold crossing (e.g., > 0 mV or > -20 mV)
-        return Vm.max() > 0.0
-
-    # Ensure hi evokes and lo does not
-    if not test_scale(scale_hi):
+        _multiply(base, s, out=_stim_buf)
+        # detect AP: threshold crossing at the recording node
+        if spikes is None:
+            apc.n = 0
+            _run(tstop)
+            return apc.n > 0
+        spikes.resize(0)
+        _run(tstop)
+        return spikes.size() > 0
+
+    try:
+        return bracketed_search(test_scale, scale_lo, scale_hi, tol=tol,
+                                max_iters=max_iters, max_widen=max_widen)
+    finally:
+        if spikes is not None:
+            pc.gid_clear()  # free gid 0 for the next fiber
+
+def bracketed_search(fires, scale_lo, scale_hi, tol=1e-2, max_iters=20, max_widen=0):
+    """
+    Binary search for the smallest scale s with fires(s) True.
+    - fires: callable s -> bool, monotone in s (AP evoked or not). The response is
+      all-or-none, so there is no margin to interpolate on and bisection is used.
+    - scale_lo, scale_hi, tol, max_iters, max_widen: as in find_threshold
+    - returns the upper end of the final bracket (an evoking scale), or None if
+      the (widened) bracket does not contain the threshold
+    """
+    # Ensure hi evokes and lo does not (widening the bracket if allowed)
+    ev_hi = fires(scale_hi)
+    ev_lo = None
+    for _ in range(max_widen):
+        if ev_hi:
+            break
+        # hi did not evoke, so it is a valid lower bound
+        scale_lo, ev_lo = scale_hi, False
+        scale_hi *= 2.0
+        ev_hi = fires(scale_hi)
+    if not ev_hi:
         print("Warning: high scale did NOT evoke AP. Increase scale_hi.")
         return None
-    if test_scale(scale_lo):
-        return scale_lo
+    if ev_lo is None:
+        ev_lo = fires(scale_lo)
+        for _ in range(max_widen):
+            if not ev_lo or scale_lo <= 0.0:
+                break
+            # lo already evokes, so it is a valid upper bound
+            scale_hi = scale_lo
+            scale_lo *= 0.5
+            ev_lo = fires(scale_lo)
+    if ev_lo:
+        if scale_lo <= 0.0:
+            return scale_lo  # fires with no stimulus at all
+        # a positive lo that still fires is only an upper bound, not the threshold
+        print("Warning: low scale already evoked AP. Decrease scale_lo.")
+        return None
 
     lo, hi = scale_lo, scale_hi
     for it in range(max_iters):
         mid_s = 0.5*(lo+hi)
-        ev = test_scale(mid_s)
-        if ev:
+        if fires(mid_s):
             hi = mid_s
         else:
             lo = mid_s
@@ -221,25 +439,223 @@ def find_threshold(fiber, tvec_ms, base_waveform_nA, scale_lo=0.0, scale_hi=1000
             break
     return hi
 
+# -------------------------
+# Strength-duration initial guess
+# -------------------------
+# Lapicque: I_th = I_rh * (1 + T_chron/pw). For intracellular injection at a node
+# the rheobase grows roughly with d^2 here; the constants were fitted to this
+# model's 0.2 ms pulse thresholds at 2 and 5 µm and are only good to ~2x.
+LAPICQUE_RHEOBASE_NA_PER_UM2 = 22.0
+LAPICQUE_CHRONAXIE_MS = 0.1
+
+def lapicque_guess(diam_um, pw_ms):
+    """
+    Closed-form threshold guess (nA, i.e. the scale factor on a 1 nA pulse)
+    for a rectangular pulse of width pw_ms.
+    """
+    i_rh = LAPICQUE_RHEOBASE_NA_PER_UM2 * diam_um**2
+    return i_rh * (1.0 + LAPICQUE_CHRONAXIE_MS/pw_ms)
+
+# -------------------------
+# Numba surrogate (warm-start bracket)
+# -------------------------
+# Same fiber, solved outside NEURON: one compartment per section, implicit
+# (Thomas / Hines tridiagonal) voltage update, exponential-Euler hh gates.
+# Only used to narrow (scale_lo, scale_hi) before the NEURON search.
+E_NA_HH = 50.0   # mV, NEURON hh default ena
+E_K_HH = -77.0   # mV, NEURON hh default ek
+
+@njit(cache=True)
+def _vtrap(x, y):
+    if abs(x/y) < 1e-6:
+        return y*(1.0 - x/y/2.0)
+    return x/(np.exp(x/y) - 1.0)
+
+@njit(cache=True, fastmath=True)
+def _hh_cable_kernel(cap_uF, gax_mS, gna_mS, gk_mS, gl_mS, el, i_stim_nA,
+                     stim_idx, rec_idx, v0, dt, q10):
+    """
+    Units: µF, mS, mV, ms -> currents in µA. Returns peak Vm (mV) at rec_idx.
+    """
+    n = cap_uF.size
+    v = np.full(n, v0)
+    m = np.empty(n)
+    hh = np.empty(n)
+    nk = np.empty(n)
+    for i in range(n):
+        am = 0.1*_vtrap(-(v0 + 40.0), 10.0)
+        bm = 4.0*np.exp(-(v0 + 65.0)/18.0)
+        ah = 0.07*np.exp(-(v0 + 65.0)/20.0)
+        bh = 1.0/(np.exp(-(v0 + 35.0)/10.0) + 1.0)
+        an = 0.01*_vtrap(-(v0 + 55.0), 10.0)
+        bn = 0.125*np.exp(-(v0 + 65.0)/80.0)
+        m[i] = am/(am + bm)
+        hh[i] = ah/(ah + bh)
+        nk[i] = an/(an + bn)
+    diag = np.empty(n)
+    rhs = np.empty(n)
+    cp = np.empty(n)
+    peak = v[rec_idx]
+    for k in range(i_stim_nA.size):
+        for i in range(n):
+            vi = v[i]
+            gna = 0.0
+            gk = 0.0
+            if gna_mS[i] > 0.0:
+                am = 0.1*_vtrap(-(vi + 40.0), 10.0)
+                bm = 4.0*np.exp(-(vi + 65.0)/18.0)
+                ah = 0.07*np.exp(-(vi + 65.0)/20.0)
+                bh = 1.0/(np.exp(-(vi + 35.0)/10.0) + 1.0)
+                an = 0.01*_vtrap(-(vi + 55.0), 10.0)
+                bn = 0.125*np.exp(-(vi + 65.0)/80.0)
+                # exponential Euler: x += (1 - exp(-dt/tau))*(xinf - x)
+                m[i] += (1.0 - np.exp(-dt*q10*(am + bm)))*(am/(am + bm) - m[i])
+                hh[i] += (1.0 - np.exp(-dt*q10*(ah + bh)))*(ah/(ah + bh) - hh[i])
+                nk[i] += (1.0 - np.exp(-dt*q10*(an + bn)))*(an/(an + bn) - nk[i])
+                gna = gna_mS[i]*m[i]*m[i]*m[i]*hh[i]
+                gk = gk_mS[i]*nk[i]*nk[i]*nk[i]*nk[i]
+            diag[i] = cap_uF[i]/dt + gna + gk + gl_mS[i]
+            rhs[i] = cap_uF[i]/dt*vi + gna*E_NA_HH + gk*E_K_HH + gl_mS[i]*el[i]
+        for i in range(n - 1):
+            diag[i] += gax_mS[i]
+            diag[i+1] += gax_mS[i]
+        rhs[stim_idx] += 1e-3*i_stim_nA[k]
+        # Thomas algorithm; off-diagonals are -gax on both sides
+        cp[0] = -gax_mS[0]/diag[0] if n > 1 else 0.0
+        rhs[0] = rhs[0]/diag[0]
+        for i in range(1, n):
+            denom = diag[i] + gax_mS[i-1]*cp[i-1]
+            if i < n - 1:
+                cp[i] = -gax_mS[i]/denom
+            rhs[i] = (rhs[i] + gax_mS[i-1]*rhs[i-1])/denom
+        v[n-1] = rhs[n-1]
+        for i in range(n - 2, -1, -1):
+            v[i] = rhs[i] - cp[i]*v[i+1]
+        if v[rec_idx] > peak:
+            peak = v[rec_idx]
+    return peak
+
+def simulate_hh_cable(diam_um, tvec_ms, i_inj_nA, n_nodes=31, record_node_index=None,
+                      detailed_paranodes=False):
+    """
+    Surrogate of make_MRG_fiber + find_threshold's run: inject i_inj_nA (played on
+    tvec_ms) at the middle node and return the peak Vm (mV) at the recording node.
+    """
+    L_para = paranode_length_um(diam_um)
+    L_juxta = juxta_length_um(diam_um)
+    L_intern = internode_length_from_diam(diam_um)
+    if detailed_paranodes:
+        seg_L = [L_para, L_juxta, L_intern]
+    else:
+        seg_L = [(L_para + L_juxta + L_intern)/3.0]*3  # one myelin section, nseg=3
+    # either way: 4 compartments per node period, nodes at every 4th index
+    L = [node_length_um()]
+    for i in range(n_nodes - 1):
+        L += seg_L + [node_length_um()]
+    L_cm = np.array(L)*1e-4
+    is_node = np.zeros(L_cm.size, dtype=bool)
+    is_node[::4] = True
+    r_cm = 0.5*diam_um*1e-4
+    area = np.pi*2.0*r_cm*L_cm  # cm2
+    cap_uF = np.where(is_node, CM_NODE, CM_INTERNODE)*area
+    gna_mS = np.where(is_node, G_NA_BAR, 0.0)*area*1e3
+    gk_mS = np.where(is_node, G_K_BAR, 0.0)*area*1e3
+    gl_mS = np.where(is_node, G_LEAK_NODE, G_PAS_INTERN)*area*1e3
+    el = np.full(L_cm.size, E_LEAK)
+    # axial conductance between neighbouring compartment centres
+    r_half = DEFAULT_RA*(0.5*L_cm)/(np.pi*r_cm**2)  # ohm
+    gax_mS = 1e3/(r_half[:-1] + r_half[1:])
+
+    rec_node = record_node_index if record_node_index is not None else (n_nodes - 1)
+    tstop = tvec_ms[-1] + 5.0
+    t_steps = np.arange(0.0, tstop, DT) + DT
+    i_stim = np.interp(t_steps, tvec_ms, i_inj_nA)
+    q10 = 3.0**((h.celsius - 6.3)/10.0)
+    return _hh_cable_kernel(cap_uF, gax_mS, gna_mS, gk_mS, gl_mS, el, i_stim,
+                            4*(n_nodes//2), 4*rec_node, float(h.v_init), DT, q10)
+
+def estimate_scale_bracket(diam_um, tvec_ms, base_waveform_nA, n_nodes=31,
+                           scale_lo=0.0, scale_hi=2000.0, tol=1e-1, max_iters=30,
+                           detailed_paranodes=False):
+    """
+    Bisect the surrogate threshold s_hat and return (0.8*s_hat, 1.2*s_hat)
+    as a warm-start bracket for find_threshold, or None if it never fires.
+    """
+    def fires(s):
+        return simulate_hh_cable(diam_um, tvec_ms, base_waveform_nA*s, n_nodes,
+                                 detailed_paranodes=detailed_paranodes) > AP_THRESHOLD_MV
+
+    if not fires(scale_hi):
+        return None
+    lo, hi = scale_lo, scale_hi
+    for it in range(max_iters):
+        mid_s = 0.5*(lo + hi)
+        if fires(mid_s):
+            hi = mid_s
+        else:
+            lo = mid_s
+        if (hi - lo) < tol:
+            break
+    return 0.8*hi, 1.2*hi
+
+# -------------------------
+# Diameter sweep
+# -------------------------
+def sweep_one(d, tvec, base, pw_ms, n_nodes=31):
+    """
+    Build one fiber of diameter d (µm) and return its threshold scale factor
+    for the rectangular waveform (tvec, base) of pulse width pw_ms.
+    Runs in a worker process: NEURON state is process-global, so each
+    diameter gets its own interpreter.
+    """
+    print(f"Building fiber diameter {d} µm ...")
+    f = make_MRG_fiber(diam_um=d, n_nodes=n_nodes)
+    print("Searching threshold (scale factor on 1 nA base waveform)...")
+    bracket = None
+    if HAVE_NUMBA:
+        bracket = estimate_scale_bracket(d, tvec, base, n_nodes=n_nodes)
+    if bracket is None:
+        s_guess = lapicque_guess(d, pw_ms)
+        bracket = (0.5*s_guess, 2.0*s_guess)
+    try:
+        # a missed bracket is widened inside find_threshold first
+        thr_scale = find_threshold(f, tvec, base, scale_lo=bracket[0], scale_hi=bracket[1],
+                                   tol=1e-1, max_widen=4)
+        if thr_scale is None:
+            # still missed: search the full range
+            thr_scale = find_threshold(f, tvec, base, scale_lo=0.0, scale_hi=2000.0,
+                                       tol=1e-1, max_widen=4)
+        return thr_scale
+    finally:
+        # pool workers are reused across diameters: free this fiber's sections now
+        # rather than leaving them in the model (and simulated) until GC
+        fiber_teardown(f)
+        del f
+        gc.collect()
+
 # -------------------------
 # Example usage
 # -------------------------
 if __name__ == "__main__":
-    # Build fiber
+    import multiprocessing
+
     diameters = [2.0, 5.0, 8.0]  # µm
-    results = {}
-    for d in diameters:
-        print(f"Building fiber diameter {d} µm ...")
-        f = make_MRG_fiber(diam_um=d, n_nodes=31)
-        # Construct a test waveform (nA units) - replace this with ETI-derived current waveform
-        tvec = np.arange(0.0, 5.0, DT)  # ms
-        base = np.zeros_like(tvec)
-        # a 0.2 ms rectangular current at t=0.2 ms of amplitude 1 nA (use CC vs CV waveforms in practice)
-        t_on = 0.2
-        pw = 0.2
-        base[(tvec >= t_on) & (tvec < t_on + pw)] = 1.0
-        print("Searching threshold (scale factor on 1 nA base waveform)...")
-        thr_scale = find_threshold(f, tvec, base, scale_lo=0.0, scale_hi=2000.0, tol=1e-1)
-        results[d] = thr_scale
+    # Construct a test waveform (nA units) - replace this with ETI-derived current waveform
+    # (identical for every diameter, so built once)
+    tvec = np.arange(0.0, 5.0, DT)  # ms
+    base = np.zeros_like(tvec)
+    # a 0.2 ms rectangular current at t=0.2 ms of amplitude 1 nA (use CC vs CV waveforms in practice)
+    t_on = 0.2
+    pw = 0.2
+    # tvec is uniform, so the pulse window is a plain slice
+    i0 = int(round(t_on/DT))
+    i1 = int(round((t_on + pw)/DT))
+    base[i0:i1] = 1.0
+
+    # "spawn": forked children would inherit (and share) the parent's HOC interpreter
+    with multiprocessing.get_context("spawn").Pool(len(diameters)) as pool:
+        thresholds = pool.map(functools.partial(sweep_one, tvec=tvec, base=base, pw_ms=pw), diameters)
+    results = dict(zip(diameters, thresholds))
+    for d, thr_scale in results.items():
         print(f"Diameter {d} um -> threshold scale {thr_scale} (peak nA = {thr_scale*1.0} nA)")
     print("Results:", results)
@@ -0,0 +1,120 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("neuron")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import neuron_init as ni  # noqa: E402
+
+
+class _Counted:
+    """AP test from a peak-Vm function, recording every evaluated scale."""
+
+    def __init__(self, peak):
+        self.peak = peak
+        self.calls = []
+
+    def __call__(self, s):
+        self.calls.append(s)
+        return self.peak(s) > ni.AP_THRESHOLD_MV
+
+
+def _step(thr):
+    # all-or-none response: flat subthreshold peak Vm, full spike above threshold
+    return lambda s: -65.0 if s < thr else 35.0
+
+
+def test_bracketed_search_converges_within_tol():
+    fires = _Counted(_step(37.3))
+    thr = ni.bracketed_search(fires, 0.0, 2000.0, tol=0.1, max_iters=30)
+    assert 37.3 <= thr < 37.3 + 0.1
+    # bisection: log2(2000/0.1) ~ 15 steps plus the two end points
+    assert len(fires.calls) <= 17
+
+
+def test_bracketed_search_keeps_bracket():
+    fires = _Counted(_step(123.4))
+    thr = ni.bracketed_search(fires, 0.0, 500.0, tol=1e-3, max_iters=40)
+    fired = [s for s in fires.calls if s >= 123.4]
+    quiet = [s for s in fires.calls if s < 123.4]
+    assert thr == min(fired)
+    assert thr - max(quiet) < 1e-3
+
+
+def test_bracketed_search_widens_high_end():
+    thr = ni.bracketed_search(_Counted(_step(37.3)), 5.0, 10.0, tol=0.1, max_widen=3)
+    assert 37.3 <= thr < 37.4
+    assert ni.bracketed_search(_Counted(_step(37.3)), 5.0, 10.0, tol=0.1, max_widen=1) is None
+
+
+def test_bracketed_search_widens_low_end():
+    thr = ni.bracketed_search(_Counted(_step(37.3)), 100.0, 200.0, tol=0.1, max_widen=2)
+    assert 37.3 <= thr < 37.4
+
+
+def test_bracketed_search_rejects_firing_low_end():
+    # after max_widen halvings lo still fires: that is no threshold
+    assert ni.bracketed_search(_Counted(_step(37.3)), 400.0, 800.0, tol=0.1, max_widen=2) is None
+    # firing with no stimulus at all is reported as threshold 0
+    assert ni.bracketed_search(_Counted(_step(-1.0)), 0.0, 10.0, tol=0.1) == 0.0
+
+
+def _n_sections():
+    return sum(1 for _ in ni.h.allsec())
+
+
+def _expected_parents(fiber):
+    nodes = fiber['nodes']
+    if fiber['myelins']:
+        chains = [[m] for m in fiber['myelins']]
+    else:
+        chains = [list(c) for c in zip(fiber['paranos'], fiber['juxtas'], fiber['interns'])]
+    parents = {}
+    for i, chain in enumerate(chains):
+        prev = nodes[i]
+        for sec in chain + [nodes[i+1]]:
+            parents[sec] = prev
+            prev = sec
+    return parents
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_fiber_topology_across_builds(cached):
+    # later builds reuse the template: sizes and connections must not carry over
+    start = _n_sections()
+    fibers = []
+    for n_nodes in (1, 3, 5, 2):
+        for detailed in (False, True):
+            before = _n_sections()
+            f = ni.make_MRG_fiber(2.0, n_nodes, detailed_paranodes=detailed, cached=cached)
+            fibers.append(f)
+            assert _n_sections() - before == n_nodes + (n_nodes-1)*(3 if detailed else 1)
+            parents = _expected_parents(f)
+            assert f['nodes'][0].parentseg() is None
+            for sec, parent in parents.items():
+                assert sec.parentseg().sec == parent
+                assert sec.parentseg().x == 1.0 and sec.orientation() == 0.0
+            assert len(parents) == _n_sections() - before - 1
+    # tear down newest first: every fiber's sections leave the model
+    total = _n_sections()
+    for f in reversed(fibers):
+        n = len(_expected_parents(f)) + 1
+        ni.fiber_teardown(f)
+        total -= n
+        assert _n_sections() == total
+    assert total == start
+
+
+def test_teardown_invalidates_cached_fiber():
+    before = _n_sections()
+    f = ni.make_MRG_fiber(2.0, 3, cached=True)
+    assert ni.make_MRG_fiber(2.0, 3, cached=True) is f
+    ni.fiber_teardown(f)
+    assert _n_sections() == before
+    g = ni.make_MRG_fiber(2.0, 3, cached=True)
+    assert g is not f and str(g['cell']) != str(f['cell'])
+    assert _n_sections() - before == 5
+    ni.fiber_teardown(g)